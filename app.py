@@ -1,13 +1,23 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import pyarrow as pa
 from datetime import datetime, time, timedelta
 import plotly.graph_objects as go
 import plotly.express as px
 from collections import Counter
 import base64
+import os
+import tempfile
 from io import BytesIO
 
+try:
+    from numba import njit
+except ImportError:
+    # Without numba the kernels below run as plain Python
+    def njit(**kwargs):
+        return lambda func: func
+
 # ============================================
 # PAGE CONFIG & STYLING
 # ============================================
@@ -63,108 +73,228 @@ st.markdown("""
 # ============================================
 # DATA LOADING & CACHING
 # ============================================
+# IMPORTANT: Change this path to your CSV file location
+TIMETABLE_CSV = "data/timetable - Sheet1.csv"
+# Bump whenever load_timetable's preprocessing changes, so stale caches are ignored
+TIMETABLE_SCHEMA_VERSION = 2
+# Preprocessed copy of the CSV, stored next to it and rebuilt whenever the CSV changes
+TIMETABLE_PARQUET = f"{os.path.splitext(TIMETABLE_CSV)[0]}.v{TIMETABLE_SCHEMA_VERSION}.parquet"
+
+DAY_CODES = {
+    "Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3,
+    "Friday": 4, "Saturday": 5, "Sunday": 6
+}
+
+DAY_NAMES = list(DAY_CODES)
+
+# Helper columns added by load_timetable, not part of the source data
+DERIVED_COLUMNS = ["start_sec", "end_sec", "day_code"]
+
+def seconds_since_midnight(t):
+    """Convert a time of day to seconds since midnight"""
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+def timetable_source():
+    """Identify the CSV a cached timetable was built from"""
+    stat = os.stat(TIMETABLE_CSV)
+    return {
+        "path": os.path.abspath(TIMETABLE_CSV),
+        "mtime": stat.st_mtime,
+        "size": stat.st_size
+    }
+
 @st.cache_data
 def load_timetable():
     """Load and preprocess timetable data"""
-    # IMPORTANT: Change this path to your CSV file location
-    df = pd.read_csv("data/timetable - Sheet1.csv")
-    
-    # Normalize column names
-    df.columns = df.columns.str.strip().str.lower()
-    
-    # Parse times
-    df["start_time"] = pd.to_datetime(df["start_time"], format="%H:%M").dt.time
-    df["end_time"] = pd.to_datetime(df["end_time"], format="%H:%M").dt.time
+    source = timetable_source()
+    if os.path.exists(TIMETABLE_PARQUET):
+        try:
+            cached = pd.read_parquet(TIMETABLE_PARQUET)
+        except (OSError, ValueError, NotImplementedError):
+            # Unreadable cache, rebuild it from the CSV
+            cached = None
+        # Only trust a cache built from this exact CSV
+        if cached is not None and cached.attrs.get("source") == source:
+            return cached
+    
+    # Normalize column names, keeping the raw ones to address columns while parsing
+    header = pd.read_csv(TIMETABLE_CSV, nrows=0).columns
+    column_names = {col: col.strip().lower() for col in header}
+    
+    # Times are parsed by the pyarrow reader straight into time-of-day values;
+    # rooms stay text even when every room is a number like 101
+    time_dtype = pd.ArrowDtype(pa.time32("s"))
+    dtypes = {"start_time": time_dtype, "end_time": time_dtype, "room": str}
+    df = pd.read_csv(
+        TIMETABLE_CSV,
+        engine="pyarrow",
+        dtype={
+            col: dtypes[name] for col, name in column_names.items()
+            if name in dtypes
+        }
+    ).rename(columns=column_names)
+    
+    # Integer encodings for fast vectorized comparisons
+    seconds_dtype = pd.ArrowDtype(pa.int32())
+    df["start_sec"] = df["start_time"].astype(seconds_dtype).to_numpy(dtype="int32")
+    df["end_sec"] = df["end_time"].astype(seconds_dtype).to_numpy(dtype="int32")
+    df["start_time"] = df["start_time"].to_numpy()
+    df["end_time"] = df["end_time"].to_numpy()
+    df["day_code"] = df["day"].map(DAY_CODES).fillna(-1).astype("int8")
     
     # Clean whitespace
     df["lschool"] = df["lschool"].str.strip()
     df["faculty"] = df["faculty"].str.strip()
     df["course"] = df["course"].str.strip()
     
+    # Categorical codes make filtering compare integers instead of strings;
+    # sorted categories double as the filter option lists
+    for col in ("lschool", "faculty", "day", "room", "course"):
+        categories = sorted(df[col].dropna().unique())
+        df[col] = df[col].astype(pd.CategoricalDtype(categories, ordered=True))
+    
+    # Saved with the Parquet file and checked on the next load
+    df.attrs["source"] = source
+    
+    # Write to a temp file and swap it in, so a crash never leaves a partial cache
+    try:
+        fd, tmp_path = tempfile.mkstemp(suffix=".parquet.tmp", dir=os.path.dirname(TIMETABLE_PARQUET))
+        os.close(fd)
+    except OSError:
+        # Read-only deployments just go without the cache
+        return df
+    try:
+        df.to_parquet(tmp_path, compression="zstd")
+        os.replace(tmp_path, TIMETABLE_PARQUET)
+    except (OSError, ValueError, TypeError, NotImplementedError):
+        # Failed writes, or columns pyarrow can't store, just skip the cache
+        os.remove(tmp_path)
+    
     return df
 
 # ============================================
 # UTILITY FUNCTIONS
 # ============================================
-def get_current_classes(df):
-    """Get classes happening right now"""
+def present_codes(series):
+    """Sorted unique category codes that occur in a categorical column"""
+    codes = series.cat.codes.values
+    return np.unique(codes[codes >= 0])
+
+def present_categories(series):
+    """Sorted categories that actually occur in a categorical column"""
+    return tuple(series.cat.categories.take(present_codes(series)))
+
+# Cached helpers take the timetable as an unhashed `_df` plus a cheap `frame_key`
+# identifying it, since hashing the frame costs more than the work being cached
+
+@st.cache_data(max_entries=32)
+def get_unique_lookups(_df, frame_key):
+    """Sorted unique values used by filters and room lookups"""
+    return {
+        "faculties": present_categories(_df["faculty"]),
+        "schools": present_categories(_df["lschool"]),
+        "rooms": present_categories(_df["room"]),
+        "room_codes": present_codes(_df["room"]),
+        "days_present": present_categories(_df["day"])
+    }
+
+# Shared rather than copied per call; callers only slice the partitions
+@st.cache_resource(max_entries=32)
+def partition_by_day(_df, frame_key):
+    """Split timetable into per-day frames sorted by start time, with their time arrays"""
+    partitions = {}
+    for day_code, day_df in _df.groupby("day_code", sort=False):
+        day_df = day_df.sort_values("start_sec", kind="stable")
+        partitions[day_code] = (day_df, day_df["start_sec"].to_numpy(), day_df["end_sec"].to_numpy())
+    return partitions
+
+def get_day_schedule(df, frame_key, day_code):
+    """Get (classes, start_sec, end_sec) for a given day, sorted by start time"""
+    partitions = partition_by_day(df, frame_key)
+    if day_code in partitions:
+        return partitions[day_code]
+    empty = df.iloc[0:0]
+    return empty, empty["start_sec"].to_numpy(), empty["end_sec"].to_numpy()
+
+def get_day_classes(df, frame_key, day_code):
+    """Get classes for a given day, sorted by start time"""
+    return get_day_schedule(df, frame_key, day_code)[0]
+
+def current_context():
+    """Get (day_code, now_sec) for this rerun, shared by every "right now" helper"""
     now = datetime.now()
-    current_day = now.strftime("%A")
-    current_time = now.time()
-    
-    ongoing = df[
-        (df["day"] == current_day) &
-        (df["start_time"] <= current_time) &
-        (df["end_time"] >= current_time)
-    ]
+    return now.weekday(), seconds_since_midnight(now)
+
+def get_current_classes(df, frame_key, now_ctx):
+    """Get classes happening right now"""
+    day_code, now_sec = now_ctx
+    
+    today, start_sec, end_sec = get_day_schedule(df, frame_key, day_code)
+    # Only classes that have already started can be ongoing
+    started = np.searchsorted(start_sec, now_sec, side="right")
+    ongoing = today.iloc[:started][end_sec[:started] >= now_sec]
     return ongoing
 
-def get_next_classes(df, limit=5):
+def get_next_classes(df, frame_key, now_ctx, limit=5):
     """Get next upcoming classes"""
-    now = datetime.now()
-    current_day = now.strftime("%A")
-    current_time = now.time()
+    day_code, now_sec = now_ctx
     
-    today_classes = df[df["day"] == current_day].copy()
-    upcoming = today_classes[today_classes["start_time"] > current_time]
+    today_classes, start_sec, _ = get_day_schedule(df, frame_key, day_code)
+    first_upcoming = np.searchsorted(start_sec, now_sec, side="right")
     
-    if len(upcoming) == 0:
-        days_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        current_idx = days_order.index(current_day) if current_day in days_order else 0
-        tomorrow = days_order[(current_idx + 1) % 7]
-        upcoming = df[df["day"] == tomorrow].copy()
+    if first_upcoming == len(start_sec):
+        tomorrow = (day_code + 1) % 7
+        return get_day_classes(df, frame_key, tomorrow).head(limit)
     
-    return upcoming.head(limit)
+    return today_classes.iloc[first_upcoming:first_upcoming + limit]
 
-def get_free_rooms(df):
+def get_free_rooms(df, frame_key, now_ctx):
     """Get rooms not in use right now"""
-    all_rooms = sorted(df["room"].dropna().astype(str).unique())
-    ongoing = get_current_classes(df)
-    occupied = set(ongoing["room"].dropna().astype(str))
-    free = [r for r in all_rooms if r not in occupied]
-    return free
+    all_codes = get_unique_lookups(df, frame_key)["room_codes"]
+    occupied = present_codes(get_current_classes(df, frame_key, now_ctx)["room"])
+    free = np.setdiff1d(all_codes, occupied, assume_unique=True)
+    return df["room"].cat.categories.take(free).tolist()
 
-def get_busy_rooms(df):
+def get_busy_rooms(df, frame_key, now_ctx):
     """Get currently occupied rooms"""
-    ongoing = get_current_classes(df)
-    busy = sorted(ongoing["room"].dropna().astype(str).unique())
+    ongoing = get_current_classes(df, frame_key, now_ctx)
+    busy = list(present_categories(ongoing["room"]))
     return busy
 
-def calculate_time_until_next_class(df):
+def calculate_time_until_next_class(df, frame_key, now_ctx):
     """Calculate minutes until next class"""
-    now = datetime.now()
-    current_day = now.strftime("%A")
-    current_time = now.time()
+    day_code, now_sec = now_ctx
     
-    today_classes = df[df["day"] == current_day].copy()
-    future_classes = today_classes[today_classes["start_time"] > current_time]
+    _, start_sec, _ = get_day_schedule(df, frame_key, day_code)
+    first_upcoming = np.searchsorted(start_sec, now_sec, side="right")
     
-    if len(future_classes) > 0:
-        next_start = future_classes.iloc[0]["start_time"]
-        delta = datetime.combine(datetime.now().date(), next_start) - datetime.now()
-        return max(0, int(delta.total_seconds() // 60))
+    if first_upcoming < len(start_sec):
+        next_start = int(start_sec[first_upcoming])
+        return max(0, (next_start - now_sec) // 60)
     return None
 
-def highlight_current(row):
+def current_class_mask(df, now_ctx):
+    """Boolean mask of rows happening right now"""
+    day_code, now_sec = now_ctx
+    
+    return (
+        (df["day_code"].values == day_code) &
+        (df["start_sec"].values <= now_sec) &
+        (df["end_sec"].values >= now_sec)
+    )
+
+def highlight_current(frame, mask):
     """Highlight current class rows"""
-    now = datetime.now()
-    current_day = now.strftime("%A")
-    current_time = now.time()
-    
-    if row["day"] == current_day and row["start_time"] <= current_time <= row["end_time"]:
-        return ["background-color: #d4edda; font-weight: bold;"] * len(row)
-    return [""] * len(row)
+    css = np.where(mask, "background-color: #d4edda; font-weight: bold;", "")[:, None]
+    return np.broadcast_to(css, frame.shape).copy()
 
-def get_faculty_workload(df):
+@st.cache_data(max_entries=32)
+def get_faculty_workload(_df, frame_key):
     """Calculate faculty class count and hours"""
-    df_temp = df.copy()
-    df_temp["duration_minutes"] = df_temp.apply(
-        lambda x: int((datetime.combine(datetime.min, x["end_time"]) - 
-                      datetime.combine(datetime.min, x["start_time"])).total_seconds() / 60),
-        axis=1
-    )
+    df_temp = _df.copy()
+    df_temp["duration_minutes"] = (df_temp["end_sec"] - df_temp["start_sec"]) // 60
     
-    workload = df_temp.groupby("faculty").agg({
+    workload = df_temp.groupby("faculty", observed=True).agg({
         "course": "count",
         "duration_minutes": "sum"
     }).rename(columns={"course": "num_classes", "duration_minutes": "total_minutes"})
@@ -173,42 +303,113 @@ def get_faculty_workload(df):
     workload = workload.sort_values("total_hours", ascending=False)
     return workload
 
-def detect_scheduling_conflicts(df):
-    """Detect room conflicts (same room, same time)"""
-    now = datetime.now()
-    current_day = now.strftime("%A")
+@njit(cache=True)
+def _sweep_room_overlaps(room_code, start_sec, end_sec, first, second):
+    """Write overlapping index pairs into first/second, returning the total count"""
+    n = len(start_sec)
+    active = np.empty(n, dtype=np.int64)
+    n_active = 0
+    count = 0
+    
+    for i in range(n):
+        if i > 0 and room_code[i] != room_code[i - 1]:
+            n_active = 0
+        
+        # Classes that ended before this one starts can't overlap anything later
+        kept = 0
+        for k in range(n_active):
+            j = active[k]
+            if end_sec[j] > start_sec[i]:
+                active[kept] = j
+                kept += 1
+                if end_sec[i] > start_sec[j]:
+                    if count < len(first):
+                        first[count] = j
+                        second[count] = i
+                    count += 1
+        
+        active[kept] = i
+        n_active = kept + 1
+    
+    return count
+
+def sweep_conflicts(room_code, start_sec, end_sec):
+    """Find overlapping class pairs in arrays sorted by room, then start time"""
+    empty = np.empty(0, dtype=np.int64)
+    count = _sweep_room_overlaps(room_code, start_sec, end_sec, empty, empty)
+    
+    first = np.empty(count, dtype=np.int64)
+    second = np.empty(count, dtype=np.int64)
+    _sweep_room_overlaps(room_code, start_sec, end_sec, first, second)
+    return first, second
+
+def find_day_conflicts(day_df):
+    """Find room conflicts (same room, same time) among one day's classes"""
+    today = day_df[day_df["room"].cat.codes.values >= 0]
+    
+    order = np.lexsort((today["start_sec"].values, today["room"].cat.codes.values))
+    today = today.iloc[order]
+    first, second = sweep_conflicts(
+        today["room"].cat.codes.values,
+        today["start_sec"].values,
+        today["end_sec"].values
+    )
     
-    today = df[df["day"] == current_day].copy()
+    rows = today[["room", "course", "start_time", "end_time", "faculty"]].to_numpy()
     conflicts = []
     
-    for idx, row in today.iterrows():
-        overlapping = today[
-            (today["room"] == row["room"]) &
-            (today.index != idx) &
-            (today["start_time"] < row["end_time"]) &
-            (today["end_time"] > row["start_time"])
-        ]
-        
-        if len(overlapping) > 0:
-            for _, overlap_row in overlapping.iterrows():
-                conflict = {
-                    "Room": row["room"],
-                    "Course 1": row["course"],
-                    "Time 1": f"{row['start_time']} - {row['end_time']}",
-                    "Faculty 1": row["faculty"],
-                    "Course 2": overlap_row["course"],
-                    "Time 2": f"{overlap_row['start_time']} - {overlap_row['end_time']}",
-                    "Faculty 2": overlap_row["faculty"]
-                }
-                if conflict not in conflicts:
-                    conflicts.append(conflict)
+    for i, j in zip(first, second):
+        room, course_1, start_1, end_1, faculty_1 = rows[i]
+        _, course_2, start_2, end_2, faculty_2 = rows[j]
+        conflicts.append({
+            "Room": room,
+            "Course 1": course_1,
+            "Time 1": f"{start_1} - {end_1}",
+            "Faculty 1": faculty_1,
+            "Course 2": course_2,
+            "Time 2": f"{start_2} - {end_2}",
+            "Faculty 2": faculty_2
+        })
     
     return pd.DataFrame(conflicts) if conflicts else None
 
+@st.cache_data(max_entries=32)
+def all_conflicts(_df, frame_key):
+    """Room conflicts for every day, keyed by day code"""
+    conflicts = {}
+    for day_code, (day_df, _, _) in partition_by_day(_df, frame_key).items():
+        day_conflicts = find_day_conflicts(day_df)
+        if day_conflicts is not None:
+            conflicts[day_code] = day_conflicts
+    return conflicts
+
+def detect_scheduling_conflicts(df, frame_key, now_ctx):
+    """Detect room conflicts (same room, same time)"""
+    day_code, _ = now_ctx
+    return all_conflicts(df, frame_key).get(day_code)
+
+def detect_weekly_conflicts(df, frame_key):
+    """Detect room conflicts across the whole week"""
+    by_day = all_conflicts(df, frame_key)
+    days = {DAY_NAMES[code]: by_day[code] for code in sorted(by_day) if code >= 0}
+    if not days:
+        return None
+    return pd.concat(days, names=["Day"]).reset_index(level="Day").reset_index(drop=True)
+
+# Workbooks are large, so only keep the last few
+@st.cache_data(max_entries=4)
+def build_xlsx(_df, frame_key):
+    """Render timetable as an Excel workbook"""
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        _df.to_excel(writer, sheet_name='Timetable', index=False)
+    return buffer.getvalue()
+
 # ============================================
 # MAIN APP
 # ============================================
 df = load_timetable()
+now_ctx = current_context()
 
 # Sidebar Navigation
 st.sidebar.title("🎓 Classroom Management System")
@@ -221,13 +422,25 @@ page = st.sidebar.radio(
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("Quick Filters")
-school_filter = st.sidebar.multiselect(
-    "Filter by School",
-    sorted(df["lschool"].unique()),
-    default=sorted(df["lschool"].unique())
-)
+all_schools = df["lschool"].cat.categories.tolist()
+# Only render the long option list when the user wants to narrow it down
+if st.sidebar.checkbox("All schools", value=True):
+    school_filter = all_schools
+else:
+    # Start from every school so unchecking narrows the view instead of emptying it
+    school_filter = st.sidebar.multiselect("Filter by School", all_schools, default=all_schools)
+    if not school_filter:
+        st.info("Select at least one school in the sidebar.")
+        st.stop()
 
-filtered_df = df[df["lschool"].isin(school_filter)].copy()
+if len(school_filter) == len(all_schools):
+    filtered_df = df
+else:
+    filtered_df = df[df["lschool"].isin(school_filter)]
+# filtered_df is fully determined by the CSV and the school selection;
+# sorted so the same schools picked in any order share cache entries
+frame_key = (os.path.getmtime(TIMETABLE_CSV), tuple(sorted(school_filter)))
+filtered_lookups = get_unique_lookups(filtered_df, frame_key)
 
 # ============================================
 # PAGE: DASHBOARD
@@ -247,7 +460,7 @@ if page == "📊 Dashboard":
         )
     
     with col2:
-        current_classes = get_current_classes(filtered_df)
+        current_classes = get_current_classes(filtered_df, frame_key, now_ctx)
         st.metric(
             "🎓 Ongoing Now",
             len(current_classes),
@@ -255,15 +468,15 @@ if page == "📊 Dashboard":
         )
     
     with col3:
-        free_rooms = get_free_rooms(filtered_df)
+        free_rooms = get_free_rooms(filtered_df, frame_key, now_ctx)
         st.metric(
             "🚪 Free Rooms",
             len(free_rooms),
-            f"Out of {len(filtered_df['room'].unique())}"
+            f"Out of {len(filtered_lookups['rooms'])}"
         )
     
     with col4:
-        unique_faculty = len(filtered_df["faculty"].unique())
+        unique_faculty = len(filtered_lookups["faculties"])
         st.metric(
             "👨‍🏫 Faculty Members",
             unique_faculty,
@@ -271,7 +484,7 @@ if page == "📊 Dashboard":
         )
     
     with col5:
-        minutes_until = calculate_time_until_next_class(filtered_df)
+        minutes_until = calculate_time_until_next_class(filtered_df, frame_key, now_ctx)
         if minutes_until is not None:
             hours = minutes_until // 60
             mins = minutes_until % 60
@@ -290,7 +503,7 @@ if page == "📊 Dashboard":
     
     with col1:
         st.subheader("🔴 Classes Happening Right Now")
-        current = get_current_classes(filtered_df)
+        current = get_current_classes(filtered_df, frame_key, now_ctx)
         
         if current.empty:
             st.info("✅ No classes happening right now. Campus is quiet!")
@@ -304,14 +517,15 @@ if page == "📊 Dashboard":
     
     with col2:
         st.subheader("📅 Next Classes")
-        next_classes = get_next_classes(filtered_df, limit=5)
+        next_classes = get_next_classes(filtered_df, frame_key, now_ctx, limit=5)
         
         if next_classes.empty:
             st.warning("No upcoming classes today")
         else:
-            for idx, row in next_classes.iterrows():
-                st.write(f"**{row['course']}**")
-                st.caption(f"🕐 {row['start_time']} | 🚪 Room {row['room']} | 👨‍🏫 {row['faculty']}")
+            st.markdown("\n\n".join(
+                f"**{row.course}**  \n:gray[🕐 {row.start_time} | 🚪 Room {row.room} | 👨‍🏫 {row.faculty}]"
+                for row in next_classes.itertuples()
+            ))
 
 # ============================================
 # PAGE: CLASSES
@@ -324,21 +538,24 @@ elif page == "📚 Classes":
     with col1:
         day_filter = st.selectbox(
             "Select Day",
-            ["All"] + sorted(filtered_df["day"].unique())
+            ["All"] + list(filtered_lookups["days_present"])
         )
     
     with col2:
         course_search = st.text_input("🔍 Search Course Name")
     
     with col3:
-        faculty_filter = st.multiselect(
-            "Filter Faculty",
-            sorted(filtered_df["faculty"].unique()),
-            key="faculty_select"
-        )
+        if st.checkbox("All faculty", value=True, key="faculty_all"):
+            faculty_filter = []
+        else:
+            faculty_filter = st.multiselect(
+                "Filter Faculty",
+                filtered_lookups["faculties"],
+                key="faculty_select"
+            )
     
     # Apply filters
-    result_df = filtered_df.copy()
+    result_df = filtered_df
     
     if day_filter != "All":
         result_df = result_df[result_df["day"] == day_filter]
@@ -355,7 +572,9 @@ elif page == "📚 Classes":
     else:
         display_cols = ["lschool", "course", "day", "start_time", "end_time", "room", "faculty"]
         st.dataframe(
-            result_df[display_cols].style.apply(highlight_current, axis=1),
+            result_df[display_cols].style.apply(
+                highlight_current, axis=None, mask=current_class_mask(result_df, now_ctx)
+            ),
             use_container_width=True,
             hide_index=True
         )
@@ -372,7 +591,7 @@ elif page == "🚪 Room Status":
     
     with col1:
         st.subheader("🟢 Free Rooms Right Now")
-        free_rooms = get_free_rooms(filtered_df)
+        free_rooms = get_free_rooms(filtered_df, frame_key, now_ctx)
         
         if free_rooms:
             st.success(f"**{len(free_rooms)}** rooms available")
@@ -382,8 +601,8 @@ elif page == "🚪 Room Status":
     
     with col2:
         st.subheader("🔴 Occupied Rooms Right Now")
-        busy_rooms = get_busy_rooms(filtered_df)
-        current = get_current_classes(filtered_df)
+        busy_rooms = get_busy_rooms(filtered_df, frame_key, now_ctx)
+        current = get_current_classes(filtered_df, frame_key, now_ctx)
         
         if busy_rooms:
             st.info(f"**{len(busy_rooms)}** rooms in use")
@@ -398,7 +617,7 @@ elif page == "👨‍🏫 Faculty":
     st.title("👨‍🏫 Faculty Schedule & Workload")
     
     st.subheader("📋 Faculty Schedule Details")
-    selected_faculty = st.selectbox("Select Faculty", sorted(filtered_df["faculty"].unique()))
+    selected_faculty = st.selectbox("Select Faculty", filtered_lookups["faculties"])
     
     faculty_schedule = filtered_df[filtered_df["faculty"] == selected_faculty]
     st.dataframe(
@@ -414,11 +633,7 @@ elif page == "👨‍🏫 Faculty":
         st.metric("Total Classes", len(faculty_schedule))
     
     with col2:
-        total_mins = faculty_schedule.apply(
-            lambda x: int((datetime.combine(datetime.min, x["end_time"]) - 
-                          datetime.combine(datetime.min, x["start_time"])).total_seconds() / 60),
-            axis=1
-        ).sum()
+        total_mins = int(((faculty_schedule["end_sec"] - faculty_schedule["start_sec"]) // 60).sum())
         st.metric("Total Teaching Hours", f"{total_mins // 60}h {total_mins % 60}m")
     
     with col3:
@@ -432,7 +647,10 @@ elif page == "⚠️ Conflicts":
     
     st.info("🔍 Analyzing schedule for conflicts...")
     
-    conflicts = detect_scheduling_conflicts(filtered_df)
+    if st.checkbox("Show conflicts for the whole week", value=False):
+        conflicts = detect_weekly_conflicts(filtered_df, frame_key)
+    else:
+        conflicts = detect_scheduling_conflicts(filtered_df, frame_key, now_ctx)
     
     if conflicts is None or len(conflicts) == 0:
         st.success("✅ **No scheduling conflicts detected!** Schedule is clean.")
@@ -448,7 +666,8 @@ elif page == "⚙️ Settings":
     
     st.subheader("📥 Export Data")
     
-    csv_data = filtered_df.to_csv(index=False)
+    export_df = filtered_df.drop(columns=DERIVED_COLUMNS)
+    csv_data = export_df.to_csv(index=False)
     st.download_button(
         label="📥 Download CSV",
         data=csv_data,
@@ -456,27 +675,26 @@ elif page == "⚙️ Settings":
         mime="text/csv"
     )
     
-    try:
-        from openpyxl import Workbook
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            filtered_df.to_excel(writer, sheet_name='Timetable', index=False)
-        buffer.seek(0)
-        st.download_button(
-            label="📥 Download Excel",
-            data=buffer.getvalue(),
-            file_name="timetable.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-    except:
-        st.warning("Excel export requires: pip install openpyxl")
+    # Building the workbook is slow, so only do it on request
+    if st.button("📄 Prepare Excel"):
+        try:
+            st.download_button(
+                label="📥 Download Excel",
+                data=build_xlsx(export_df, frame_key),
+                file_name="timetable.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                # Don't rerun on download, or this button would disappear
+                on_click="ignore"
+            )
+        except ImportError:
+            st.warning("Excel export requires: pip install openpyxl")
     
     st.markdown("---")
     
     st.subheader("📋 Raw Data Viewer")
     
     if st.checkbox("Show raw data", value=False):
-        st.dataframe(filtered_df, use_container_width=True)
+        st.dataframe(export_df, use_container_width=True)
 
 st.markdown("---")
 st.markdown("<div style='text-align: center; color: gray;'>📚 Smart Classroom Management System | Built with Streamlit</div>", unsafe_allow_html=True)